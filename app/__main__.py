@@ -2,8 +2,6 @@
 
 import os
 
-import uvicorn
-
 
 def _env_true(value: str | None) -> bool:
     if value is None:
@@ -27,6 +25,8 @@ def main() -> None:
             "Running outside AWS Lambda requires CURVE_FITTER_LOCAL_SERVER=true."
         )
 
+    import uvicorn
+
     uvicorn.run(
         "app.main:app",
         host=os.getenv("CURVE_FITTER_LOCAL_HOST", "0.0.0.0"),
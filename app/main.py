@@ -4,16 +4,19 @@ from __future__ import annotations
 import asyncio
 import json
 import os
-import threading
-from datetime import datetime, timezone
+import time
 from pathlib import Path
 from typing import AsyncIterator
 
 import numpy as np
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import HTMLResponse, StreamingResponse
-from mangum import Mangum
+from fastapi.responses import HTMLResponse, Response, StreamingResponse
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - exercised only without orjson installed
+    orjson = None
 
 _TEMPLATE_ROOT = Path(__file__).resolve().parent / "templates"
 _INDEX_TEMPLATE = (_TEMPLATE_ROOT / "index.html").read_text(encoding="utf-8")
@@ -40,7 +43,12 @@ app.add_middleware(
     allow_headers=["*"],
     expose_headers=["*"],   
 )
-handler = Mangum(app)
+# The Lambda adapter is only needed when running under the Lambda runtime, so
+# local servers skip importing it.
+if os.environ.get("AWS_LAMBDA_RUNTIME_API"):
+    from mangum import Mangum
+
+    handler = Mangum(app)
 
 # Tenors that roughly align with LCH cleared BRL swap grid, expressed in years.
 TENOR_YEARS = np.array([0.5, 1, 2, 3, 4, 5, 7, 10, 15, 20, 30], dtype=float)
@@ -49,6 +57,22 @@ FITTED_GRID = np.linspace(0.5, 30.0, num=120)
 MIN_CURVE_RATE = 1.5
 MAX_MUTATED_POINTS = 2
 MAX_MUTATION_FRACTION = 0.20
+# Number of mutations whose random draws are generated up front in one batch.
+MUTATION_BATCH_SIZE = 4096
+# Shared list views of the constant grids; snapshots hand these out as-is,
+# so callers must not mutate them.
+_TENOR_YEARS_LIST = TENOR_YEARS.tolist()
+_FITTED_GRID_LIST = FITTED_GRID.tolist()
+
+# The fit always runs on the same tenors and grid, so the least-squares
+# projection and the grid Vandermonde matrix are computed once up front.
+_DEGREE = 4
+_V_TENOR = np.vander(TENOR_YEARS, _DEGREE + 1)
+_PINV_TENOR = np.linalg.pinv(_V_TENOR)
+_V_GRID = np.vander(FITTED_GRID, _DEGREE + 1)
+# Output buffers for fits on the default tenors and grid, overwritten per fit.
+_fit_coefficients = np.empty(_DEGREE + 1)
+_fitted_rates = np.empty(FITTED_GRID.size)
 
 try:
     _MUTATION_SEED = int(os.getenv("CURVE_FITTER_MUTATION_SEED", "275352"))
@@ -56,87 +80,258 @@ except ValueError:
     _MUTATION_SEED = 275352
 
 _mutation_rng = np.random.default_rng(_MUTATION_SEED)
-_curve_state_lock = threading.Lock()
+# Curve state is owned by the event loop: every caller of _sample_raw_rates
+# runs on the loop thread and the function never awaits, so no lock is needed.
 _base_curve: np.ndarray | None = None
 _current_raw_rates: np.ndarray | None = None
+# Per-tenor clip bounds, derived from the base curve when the state is seeded.
+_lower_bounds: np.ndarray | None = None
+_upper_bounds: np.ndarray | None = None
+# Pre-drawn (counts, indices, deltas) consumed one row per mutation; reset to
+# None whenever _mutation_rng is replaced.
+_mutation_batch: tuple[np.ndarray, np.ndarray, np.ndarray] | None = None
+_mutation_cursor = 0
 
 
 def _base_em_curve(tenors: np.ndarray) -> np.ndarray:
     """Create a stylised emerging-market swap curve profile."""
-    short_end = 8.0 - 0.8 * np.exp(-tenors)
-    term_premium = 1.4 * (1.0 - np.exp(-tenors / 7.0))
-    cyclical_component = 0.25 * np.sin(tenors / 1.5)
-    liquidity_drag = 0.35 * np.exp(-(tenors - 12.0) ** 2 / 30.0)
-    return short_end + term_premium + cyclical_component + liquidity_drag
+    # Short end, then term premium, cyclical component and liquidity drag,
+    # accumulated in place to avoid a temporary per component.
+    curve = 8.0 - 0.8 * np.exp(-tenors)
+    curve += 1.4 * (1.0 - np.exp(-tenors / 7.0))
+    curve += 0.25 * np.sin(tenors / 1.5)
+    curve += 0.35 * np.exp(-(tenors - 12.0) ** 2 / 30.0)
+    return curve
+
+
+def _draw_mutation_batch(
+    tenor_count: int,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Draw mutation counts, distinct tenor indices and deltas for a batch."""
+    counts = _mutation_rng.integers(
+        1, MAX_MUTATED_POINTS + 1, size=MUTATION_BATCH_SIZE
+    )
+    orderings = np.tile(np.arange(tenor_count), (MUTATION_BATCH_SIZE, 1))
+    indices = _mutation_rng.permuted(orderings, axis=1)[:, :MAX_MUTATED_POINTS]
+    deltas = _mutation_rng.uniform(
+        -MAX_MUTATION_FRACTION,
+        MAX_MUTATION_FRACTION,
+        size=(MUTATION_BATCH_SIZE, MAX_MUTATED_POINTS),
+    )
+    return counts, indices, deltas
 
 
 def _sample_raw_rates(tenors: np.ndarray) -> np.ndarray:
-    """Mutate up to two points of the curve, capping changes at 20%."""
-    global _base_curve, _current_raw_rates
+    """Mutate up to two points of the curve, capping changes at 20%.
 
-    with _curve_state_lock:
-        if _base_curve is None or _current_raw_rates is None:
-            _base_curve = _base_em_curve(tenors)
-            _current_raw_rates = _base_curve.copy()
+    Returns the live curve state rather than a copy: callers must encode or
+    copy it before the next call mutates it again.
+    """
+    global _base_curve, _current_raw_rates, _lower_bounds, _upper_bounds
+    global _mutation_batch, _mutation_cursor
 
-        mutation_count = int(
-            _mutation_rng.integers(1, MAX_MUTATED_POINTS + 1)
-        )
-        indices = _mutation_rng.choice(
-            tenors.size, size=mutation_count, replace=False
+    if _base_curve is None or _current_raw_rates is None:
+        _base_curve = _base_em_curve(tenors)
+        _current_raw_rates = _base_curve.copy()
+        _lower_bounds = np.maximum(
+            _base_curve * (1.0 - MAX_MUTATION_FRACTION), MIN_CURVE_RATE
         )
+        _upper_bounds = _base_curve * (1.0 + MAX_MUTATION_FRACTION)
 
-        for idx in np.atleast_1d(indices):
-            base_rate = float(_base_curve[idx])
-            current_rate = float(_current_raw_rates[idx])
-            delta = float(
-                _mutation_rng.uniform(-MAX_MUTATION_FRACTION, MAX_MUTATION_FRACTION)
-            )
-            proposed = current_rate * (1.0 + delta)
-            lower_bound = max(base_rate * (1.0 - MAX_MUTATION_FRACTION), MIN_CURVE_RATE)
-            upper_bound = base_rate * (1.0 + MAX_MUTATION_FRACTION)
-            _current_raw_rates[idx] = float(
-                np.clip(proposed, lower_bound, upper_bound)
-            )
+    if _mutation_batch is None or _mutation_cursor >= len(_mutation_batch[0]):
+        _mutation_batch = _draw_mutation_batch(tenors.size)
+        _mutation_cursor = 0
+    counts, index_rows, delta_rows = _mutation_batch
+    mutation_count = counts[_mutation_cursor]
+    indices = index_rows[_mutation_cursor, :mutation_count]
+    deltas = delta_rows[_mutation_cursor, :mutation_count]
+    _mutation_cursor += 1
+
+    proposed = _current_raw_rates[indices] * (1.0 + deltas)
+    _current_raw_rates[indices] = np.clip(
+        proposed, _lower_bounds[indices], _upper_bounds[indices]
+    )
 
-        return _current_raw_rates.copy()
+    return _current_raw_rates
 
 
 def _fit_curve(
-    tenors: np.ndarray, rates: np.ndarray, grid: np.ndarray, degree: int = 4
-) -> dict[str, list[float]]:
-    """Fit a polynomial to the raw rates and evaluate on the target grid."""
-    rate_variance = float(np.var(rates))
-    if rate_variance == 0:
+    tenors: np.ndarray, rates: np.ndarray, grid: np.ndarray, degree: int = _DEGREE
+) -> dict[str, object]:
+    """Fit a polynomial to the raw rates and evaluate on the target grid.
+
+    Fits on the default tenors and grid write into shared module buffers, so
+    the returned arrays are only valid until the next such fit.
+    """
+    if np.ptp(rates) == 0:
         raise HTTPException(status_code=400, detail="Cannot fit curve without variance")
 
-    coefficients = np.polyfit(tenors, rates, deg=degree)
-    fitted_rates = np.polyval(coefficients, grid)
+    if degree == _DEGREE and tenors is TENOR_YEARS and grid is FITTED_GRID:
+        coefficients = np.matmul(_PINV_TENOR, rates, out=_fit_coefficients)
+        fitted_rates = np.matmul(_V_GRID, coefficients, out=_fitted_rates)
+    else:
+        coefficients = np.linalg.pinv(np.vander(tenors, degree + 1)) @ rates
+        fitted_rates = np.vander(grid, degree + 1) @ coefficients
     return {
-        "gridYears": grid.tolist(),
-        "rates": fitted_rates.tolist(),
-        "polynomialCoefficients": coefficients.tolist(),
+        "gridYears": _FITTED_GRID_LIST if grid is FITTED_GRID else grid.tolist(),
+        "rates": fitted_rates,
+        "polynomialCoefficients": coefficients,
     }
 
 
+def _format_timestamp(now: float) -> str:
+    """Format a POSIX time like ``datetime.isoformat`` for a UTC datetime."""
+    seconds = int(now)
+    microseconds = round((now - seconds) * 1_000_000)
+    if microseconds == 1_000_000:
+        seconds, microseconds = seconds + 1, 0
+    tm = time.gmtime(seconds)
+    return (
+        f"{tm.tm_year:04d}-{tm.tm_mon:02d}-{tm.tm_mday:02d}"
+        f"T{tm.tm_hour:02d}:{tm.tm_min:02d}:{tm.tm_sec:02d}.{microseconds:06d}+00:00"
+    )
+
+
+# Reused by every call to _build_curve_snapshot; only the per-frame fields
+# are overwritten.
+_snapshot: dict[str, object] = {
+    "timestamp": "",
+    "tenorYears": _TENOR_YEARS_LIST,
+    "rawRates": None,
+    "fit": None,
+}
+
+
 def _build_curve_snapshot() -> dict[str, object]:
-    """Create a JSON-serialisable snapshot containing raw and fitted curves."""
+    """Update the shared snapshot with fresh raw and fitted curves.
+
+    The dict and its arrays are shared state, so encode the snapshot before
+    the next one is built.
+    """
     raw_rates = _sample_raw_rates(TENOR_YEARS)
-    fitted = _fit_curve(TENOR_YEARS, raw_rates, FITTED_GRID)
-    return {
-        "timestamp": datetime.now(timezone.utc).isoformat(),
-        "tenorYears": TENOR_YEARS.tolist(),
-        "rawRates": raw_rates.tolist(),
-        "fit": fitted,
-    }
+    _snapshot["fit"] = _fit_curve(TENOR_YEARS, raw_rates, FITTED_GRID)
+    _snapshot["timestamp"] = _format_timestamp(time.time())
+    _snapshot["rawRates"] = raw_rates
+    return _snapshot
+
+
+def _json_default(value: object) -> object:
+    """Convert numpy values for the stdlib ``json`` fallback encoder."""
+    if isinstance(value, (np.ndarray, np.generic)):
+        return value.tolist()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
 
 
-async def sse_gen(interval: float) -> AsyncIterator[str]:
+def _dumps(value: object) -> bytes:
+    """Serialise a value to JSON, preferring orjson when it is available."""
+    if orjson is not None:
+        return orjson.dumps(value, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(value, default=_json_default).encode("utf-8")
+
+
+# The tenor and fit grids are identical in every snapshot, so their JSON is
+# produced once and spliced into each frame.
+_TENOR_YEARS_JSON = _dumps(_TENOR_YEARS_LIST)
+_FITTED_GRID_JSON = _dumps(_FITTED_GRID_LIST)
+
+
+def _encode_snapshot(snapshot: dict[str, object]) -> bytes:
+    """Serialise a snapshot, re-encoding only the fields that change per frame."""
+    fit = snapshot.get("fit")
+    if (
+        snapshot.get("tenorYears") is not _TENOR_YEARS_LIST
+        or not isinstance(fit, dict)
+        or fit.get("gridYears") is not _FITTED_GRID_LIST
+    ):
+        return _dumps(snapshot)
+
+    return b"".join(
+        (
+            b'{"timestamp":',
+            _dumps(snapshot["timestamp"]),
+            b',"tenorYears":',
+            _TENOR_YEARS_JSON,
+            b',"rawRates":',
+            _dumps(snapshot["rawRates"]),
+            b',"fit":{"gridYears":',
+            _FITTED_GRID_JSON,
+            b',"rates":',
+            _dumps(fit["rates"]),
+            b',"polynomialCoefficients":',
+            _dumps(fit["polynomialCoefficients"]),
+            b"}}",
+        )
+    )
+
+
+class _CurveBroadcaster:
+    """Build one SSE frame per interval and share it with every subscriber."""
+
+    def __init__(self, interval: float) -> None:
+        self.interval = interval
+        self.subscribers = 0
+        self._frame = b""
+        self._sequence = 0
+        self._frame_ready = asyncio.Event()
+        self._task = asyncio.get_running_loop().create_task(self._produce())
+
+    async def _produce(self) -> None:
+        loop = asyncio.get_running_loop()
+        next_frame_at = loop.time()
+        try:
+            while True:
+                payload = _encode_snapshot(_build_curve_snapshot())
+                self._frame = b"data: " + payload + b"\n\n"
+                self._sequence += 1
+                # Wake the current waiters and hand later ones a fresh event.
+                frame_ready, self._frame_ready = self._frame_ready, asyncio.Event()
+                frame_ready.set()
+                # Schedule against a fixed cadence so build time does not stretch
+                # the interval; if the loop fell behind, restart the cadence.
+                next_frame_at += self.interval
+                delay = next_frame_at - loop.time()
+                if delay < 0:
+                    next_frame_at, delay = loop.time(), 0.0
+                await asyncio.sleep(delay)
+        finally:
+            self._frame_ready.set()
+
+    async def frames(self) -> AsyncIterator[bytes]:
+        """Yield the latest frame each time a new one is published."""
+        seen = 0
+        while True:
+            if self._sequence == seen:
+                await self._frame_ready.wait()
+                if self._sequence == seen:
+                    # The producer stopped without publishing; surface its error.
+                    self._task.result()
+                    return
+            seen = self._sequence
+            yield self._frame
+
+    def close(self) -> None:
+        self._task.cancel()
+
+
+# One producer per distinct interval, alive while it has subscribers.
+_broadcasters: dict[float, _CurveBroadcaster] = {}
+
+
+async def sse_gen(interval: float) -> AsyncIterator[bytes]:
     """Yield swap curve snapshots as SSE frames."""
-    while True:
-        payload = json.dumps(_build_curve_snapshot())
-        yield f"data: {payload}\n\n"
-        await asyncio.sleep(interval)
+    broadcaster = _broadcasters.get(interval)
+    if broadcaster is None:
+        broadcaster = _broadcasters[interval] = _CurveBroadcaster(interval)
+    broadcaster.subscribers += 1
+    try:
+        async for frame in broadcaster.frames():
+            yield frame
+    finally:
+        broadcaster.subscribers -= 1
+        if broadcaster.subscribers == 0:
+            broadcaster.close()
+            if _broadcasters.get(interval) is broadcaster:
+                del _broadcasters[interval]
 
 
 @app.get("/curves/stream")
@@ -156,9 +351,12 @@ async def stream_swap_curves(interval: float = 1.0) -> StreamingResponse:
 
 
 @app.get("/curves")
-async def get_curve_snapshot() -> dict[str, object]:
+async def get_curve_snapshot() -> Response:
     """Return a single curve snapshot with 1-2 mutated points."""
-    return _build_curve_snapshot()
+    return Response(
+        content=_encode_snapshot(_build_curve_snapshot()),
+        media_type="application/json",
+    )
 
 
 @app.get("/health")
@@ -167,10 +365,16 @@ async def health_check() -> dict[str, str]:
     return {"status": "ok"}
 
 
+# The version and build time are fixed per process, so the landing page is
+# rendered and encoded once.
+_INDEX_HTML = (
+    _INDEX_TEMPLATE.replace("{{version}}", app.version)
+    .replace("{{build_time}}", _BUILD_TIME)
+    .encode("utf-8")
+)
+
+
 @app.get("/", response_class=HTMLResponse)
 async def root() -> HTMLResponse:
-    """Render the landing page from a static HTML template."""
-    html = _INDEX_TEMPLATE.replace("{{version}}", app.version).replace(
-        "{{build_time}}", _BUILD_TIME
-    )
-    return HTMLResponse(content=html)
+    """Serve the landing page rendered from a static HTML template."""
+    return HTMLResponse(content=_INDEX_HTML)
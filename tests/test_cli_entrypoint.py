@@ -6,6 +6,7 @@ import os
 from typing import Any
 
 import pytest
+import uvicorn
 
 from app import __main__ as cli
 
@@ -67,7 +68,7 @@ def test_main_invokes_uvicorn_with_expected_configuration(monkeypatch: pytest.Mo
         captured["args"] = args
         captured["kwargs"] = kwargs
 
-    monkeypatch.setattr(cli.uvicorn, "run", _fake_run)
+    monkeypatch.setattr(uvicorn, "run", _fake_run)
 
     cli.main()
 
@@ -4,6 +4,9 @@ from __future__ import annotations
 
 import asyncio
 import json
+import os
+import time
+from datetime import datetime, timezone
 from typing import Iterator
 
 import numpy as np
@@ -20,14 +23,21 @@ class _DeterministicRng:
         self._indices = list(indices)
         self._delta = delta
 
-    def integers(self, low: int, high: int) -> int:  # noqa: D401 - numpy compatible signature
-        return len(self._indices)
+    def integers(self, low: int, high: int, size=None):  # noqa: D401 - numpy compatible signature
+        return np.full(size, len(self._indices))
 
-    def choice(self, a, size=None, replace=False):  # type: ignore[override]
-        return np.array(self._indices)
+    def permuted(self, x, axis=None):  # noqa: D401 - numpy compatible signature
+        rest = [i for i in range(x.shape[1]) if i not in self._indices]
+        return np.tile(self._indices + rest, (x.shape[0], 1))
 
-    def uniform(self, low: float, high: float) -> float:  # noqa: D401 - numpy compatible signature
-        return self._delta
+    def uniform(self, low: float, high: float, size=None):  # noqa: D401 - numpy compatible signature
+        return np.full(size, self._delta)
+
+
+def _use_rng(rng: object) -> None:
+    """Swap the mutation RNG and discard any pre-drawn mutations."""
+    main._mutation_rng = rng
+    main._mutation_batch = None
 
 
 @pytest.fixture(autouse=True)
@@ -36,9 +46,11 @@ def _reset_curve_state() -> Iterator[None]:
     original_rng = main._mutation_rng
     main._base_curve = None
     main._current_raw_rates = None
+    main._mutation_batch = None
     yield
     main._base_curve = None
     main._current_raw_rates = None
+    main._mutation_batch = None
     main._mutation_rng = original_rng
 
 
@@ -51,7 +63,7 @@ def test_base_em_curve_is_positive_and_monotonic():
 
 
 def test_sample_raw_rates_respects_bounds():
-    main._mutation_rng = _DeterministicRng(indices=[0], delta=0.19)
+    _use_rng(_DeterministicRng(indices=[0], delta=0.19))
     rates = main._sample_raw_rates(main.TENOR_YEARS)
     baseline = main._base_curve[0]
     mutated = rates[0]
@@ -63,24 +75,44 @@ def test_sample_raw_rates_respects_bounds():
 
 
 def test_sample_raw_rates_reuses_existing_state_with_multiple_mutations():
-    main._mutation_rng = _DeterministicRng(indices=[0, 1], delta=0.1)
-    first = main._sample_raw_rates(main.TENOR_YEARS)
+    _use_rng(_DeterministicRng(indices=[0, 1], delta=0.1))
+    first = main._sample_raw_rates(main.TENOR_YEARS).copy()
     original_second = first[1]
 
-    main._mutation_rng = _DeterministicRng(indices=[1], delta=-0.2)
+    _use_rng(_DeterministicRng(indices=[1], delta=-0.2))
     second = main._sample_raw_rates(main.TENOR_YEARS)
 
     assert not np.array_equal(first, second)
     assert second[1] <= original_second
 
 
+def test_sample_raw_rates_returns_live_state():
+    rates = main._sample_raw_rates(main.TENOR_YEARS)
+    assert rates is main._current_raw_rates
+
+
 def test_sample_raw_rates_honors_min_curve_floor(monkeypatch):
     monkeypatch.setattr(main, "MIN_CURVE_RATE", 8.5)
-    main._mutation_rng = _DeterministicRng(indices=[0], delta=-0.2)
+    _use_rng(_DeterministicRng(indices=[0], delta=-0.2))
     rates = main._sample_raw_rates(main.TENOR_YEARS)
     assert rates[0] == pytest.approx(8.5)
 
 
+def test_sample_raw_rates_draws_mutations_in_batches():
+    _use_rng(np.random.default_rng(7))
+    main._sample_raw_rates(main.TENOR_YEARS)
+    batch = main._mutation_batch
+    counts, indices, deltas = batch
+    assert counts.shape == (main.MUTATION_BATCH_SIZE,)
+    assert np.all((counts >= 1) & (counts <= main.MAX_MUTATED_POINTS))
+    assert np.all(indices[:, 0] != indices[:, 1])
+    assert np.all(np.abs(deltas) <= main.MAX_MUTATION_FRACTION)
+
+    main._sample_raw_rates(main.TENOR_YEARS)
+    assert main._mutation_batch is batch
+    assert main._mutation_cursor == 2
+
+
 def test_fit_curve_returns_expected_polynomial():
     tenors = np.array([1.0, 2.0, 3.0])
     rates = np.array([2.0, 4.0, 6.0])
@@ -91,6 +123,17 @@ def test_fit_curve_returns_expected_polynomial():
     assert len(result["polynomialCoefficients"]) == 2
 
 
+def test_fit_curve_matches_polyfit_on_default_grid():
+    rates = main._base_em_curve(main.TENOR_YEARS)
+    result = main._fit_curve(main.TENOR_YEARS, rates, main.FITTED_GRID)
+    expected = np.polyfit(main.TENOR_YEARS, rates, deg=4)
+    assert result["polynomialCoefficients"] == pytest.approx(expected.tolist())
+    assert result["rates"] == pytest.approx(
+        np.polyval(expected, main.FITTED_GRID).tolist()
+    )
+    assert result["rates"] is main._fitted_rates
+
+
 def test_fit_curve_rejects_zero_variance():
     tenors = np.array([1.0, 2.0, 3.0])
     rates = np.array([5.0, 5.0, 5.0])
@@ -100,14 +143,46 @@ def test_fit_curve_rejects_zero_variance():
     assert exc.value.status_code == 400
 
 
+def test_format_timestamp_matches_isoformat():
+    now = 1_715_418_000.123456
+    expected = datetime.fromtimestamp(now, timezone.utc).isoformat()
+    assert main._format_timestamp(now) == expected
+
+
 def test_build_curve_snapshot_includes_expected_shapes():
-    main._mutation_rng = _DeterministicRng(indices=[0], delta=0.0)
+    _use_rng(_DeterministicRng(indices=[0], delta=0.0))
     snapshot = main._build_curve_snapshot()
 
     assert set(snapshot) == {"timestamp", "tenorYears", "rawRates", "fit"}
     assert snapshot["tenorYears"] == pytest.approx(main.TENOR_YEARS.tolist())
     assert len(snapshot["fit"]["gridYears"]) == main.FITTED_GRID.size
     assert len(snapshot["fit"]["rates"]) == main.FITTED_GRID.size
+    assert main._build_curve_snapshot() is snapshot
+
+
+def test_encode_snapshot_falls_back_to_stdlib_json(monkeypatch):
+    snapshot = {"rates": np.array([1.5, 2.5]), "scale": np.float64(0.5)}
+    encoded = main._encode_snapshot(snapshot)
+
+    monkeypatch.setattr(main, "orjson", None)
+    assert json.loads(main._encode_snapshot(snapshot)) == json.loads(encoded)
+    assert json.loads(encoded) == {"rates": [1.5, 2.5], "scale": 0.5}
+
+
+def test_encode_snapshot_splices_constant_grids():
+    _use_rng(_DeterministicRng(indices=[0], delta=0.1))
+    snapshot = main._build_curve_snapshot()
+    event = json.loads(main._encode_snapshot(snapshot))
+
+    assert list(event) == ["timestamp", "tenorYears", "rawRates", "fit"]
+    assert event["timestamp"] == snapshot["timestamp"]
+    assert event["tenorYears"] == pytest.approx(main.TENOR_YEARS.tolist())
+    assert event["rawRates"] == pytest.approx(snapshot["rawRates"].tolist())
+    assert event["fit"]["gridYears"] == pytest.approx(main.FITTED_GRID.tolist())
+    assert event["fit"]["rates"] == pytest.approx(snapshot["fit"]["rates"].tolist())
+    assert event["fit"]["polynomialCoefficients"] == pytest.approx(
+        snapshot["fit"]["polynomialCoefficients"].tolist()
+    )
 
 
 @pytest.mark.asyncio
@@ -116,11 +191,58 @@ async def test_sse_gen_yields_json(monkeypatch):
     monkeypatch.setattr(main, "_build_curve_snapshot", lambda: payload)
     stream = main.sse_gen(interval=0)
     data = await asyncio.wait_for(anext(stream), timeout=1)
-    assert data.startswith("data: ")
-    event = json.loads(data.removeprefix("data: ").strip())
+    assert data.startswith(b"data: ")
+    assert data.endswith(b"\n\n")
+    event = json.loads(data.removeprefix(b"data: "))
     assert event == payload
 
 
+@pytest.mark.asyncio
+async def test_sse_gen_subtracts_build_time_from_interval(monkeypatch):
+    def _slow_snapshot() -> dict[str, str]:
+        time.sleep(0.05)
+        return {"message": "hello"}
+
+    delays = []
+    real_sleep = asyncio.sleep
+
+    async def _fake_sleep(delay: float) -> None:
+        delays.append(delay)
+        await real_sleep(0)
+
+    monkeypatch.setattr(main, "_build_curve_snapshot", _slow_snapshot)
+    monkeypatch.setattr(main.asyncio, "sleep", _fake_sleep)
+    stream = main.sse_gen(interval=1.0)
+    await anext(stream)
+    await anext(stream)
+    await stream.aclose()
+    assert 0.5 < delays[0] <= 0.95
+
+
+@pytest.mark.asyncio
+async def test_sse_gen_shares_frames_across_subscribers(monkeypatch):
+    calls = []
+
+    def _counting_snapshot() -> dict[str, int]:
+        calls.append(None)
+        return {"frame": len(calls)}
+
+    monkeypatch.setattr(main, "_build_curve_snapshot", _counting_snapshot)
+    first = main.sse_gen(interval=60)
+    second = main.sse_gen(interval=60)
+
+    first_frame = await asyncio.wait_for(anext(first), timeout=1)
+    second_frame = await asyncio.wait_for(anext(second), timeout=1)
+    assert first_frame == second_frame
+    assert len(calls) == 1
+    assert main._broadcasters[60].subscribers == 2
+
+    await first.aclose()
+    assert 60 in main._broadcasters
+    await second.aclose()
+    assert 60 not in main._broadcasters
+
+
 def test_stream_endpoint_rejects_non_positive_interval():
     client = TestClient(main.app)
     response = client.get("/curves/stream", params={"interval": 0})
@@ -158,6 +280,21 @@ def test_stream_endpoint_returns_streaming_response(monkeypatch):
         assert next(iterator) == "data: dummy\n\n"
 
 
+def test_curves_endpoint_returns_snapshot_json():
+    client = TestClient(main.app)
+    response = client.get("/curves")
+    assert response.status_code == 200
+    snapshot = response.json()
+    assert snapshot["tenorYears"] == pytest.approx(main.TENOR_YEARS.tolist())
+    assert len(snapshot["rawRates"]) == main.TENOR_YEARS.size
+    assert len(snapshot["fit"]["rates"]) == main.FITTED_GRID.size
+
+
+def test_lambda_handler_is_not_built_outside_lambda():
+    assert "AWS_LAMBDA_RUNTIME_API" not in os.environ
+    assert not hasattr(main, "handler")
+
+
 def test_health_endpoint_returns_status():
     client = TestClient(main.app)
     response = client.get("/health")